@@ -4,9 +4,12 @@ Interactive housing map with student-focused insights
 """
 
 import streamlit as st
+import streamlit.components.v1 as components
 import pandas as pd
+import numpy as np
 import folium
-from streamlit_folium import st_folium
+from folium.plugins import MarkerCluster
+from jinja2 import Template
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
@@ -42,27 +45,141 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+DATA_PATH = 'data/geocoded/all_listings_geocoded.parquet'
+# Output of pipeline runs from before the Parquet switch
+CSV_DATA_PATH = 'data/geocoded/all_listings_geocoded.csv'
+
+# Columns the app reads (map, filters and table picker); raw descriptions stay on disk
+USED_COLUMNS = [
+    'listing_id', 'property_management', 'address', 'unit_number',
+    'price_monthly', 'bedrooms', 'bathrooms', 'room_type', 'person_capacity',
+    'walk_time_to_campus_min', 'distance_to_ucsb_meters', 'noise_score',
+    'available_date', 'scraped_date', 'amenities', 'parking_cost_yearly',
+    'is_remodeled', 'has_parking', 'has_balcony', 'has_patio', 'split_floor_plan',
+    'latitude', 'longitude', 'source_url'
+]
+
+# Narrow dtypes for the columns the filters scan
+COLUMN_DTYPES = {
+    'price_monthly': 'float32',
+    'bedrooms': 'float32',
+    'bathrooms': 'float32',
+    'person_capacity': 'float32',
+    'walk_time_to_campus_min': 'float32',
+    'distance_to_ucsb_meters': 'float32',
+    'noise_score': 'float32',
+    'parking_cost_yearly': 'float32',
+    'is_remodeled': 'bool',
+    'has_balcony': 'bool',
+    'has_patio': 'bool',
+    'has_parking': 'bool',
+    'split_floor_plan': 'bool'
+}
+FLAG_COLUMNS = [name for name, dtype in COLUMN_DTYPES.items() if dtype == 'bool']
+
+def get_data_version():
+    """Modification time of the listings file, used to invalidate caches"""
+    for path in (DATA_PATH, CSV_DATA_PATH):
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            continue
+    return None
+
+def read_listings():
+    """Read the used columns from Parquet, falling back to the CSV export"""
+    if os.path.exists(DATA_PATH):
+        return pd.read_parquet(DATA_PATH, engine='pyarrow', columns=USED_COLUMNS)
+    return pd.read_csv(
+        CSV_DATA_PATH,
+        usecols=USED_COLUMNS,
+        engine='pyarrow',
+        parse_dates=['available_date', 'scraped_date']
+    )
+
 # Load data function with caching
 @st.cache_data
-def load_data():
+def load_data(data_version=None):
     """Load enriched listings data"""
     try:
-        df = pd.read_csv('data/geocoded/all_listings_geocoded.csv')
-        df['available_date'] = pd.to_datetime(df['available_date'])
+        df = read_listings()
+        # Missing flags mean "no"; a bare bool cast would turn NaN into True
+        df[FLAG_COLUMNS] = df[FLAG_COLUMNS].fillna(False)
+        df = df.astype(COLUMN_DTYPES)
         df = df.dropna(subset=['latitude', 'longitude'])
         return df
     except FileNotFoundError:
         st.error("⚠️ No data found. Please run the data pipeline first!")
         st.stop()
 
-def get_price_color(price):
+# Most listings the map will draw; larger results are truncated by price
+MAX_MAP_MARKERS = 2000
+
+# Each data row is [lat, lon, popup_html, color, tooltip]
+class ListingMarkers(folium.MacroElement):
+    """Listing circle markers drawn from one JSON array by a single script"""
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = {{ this.data|tojson }};
+            {{ this.get_name() }}.forEach(function (row) {
+                L.circleMarker([row[0], row[1]], {
+                    radius: 10,
+                    color: row[3],
+                    fill: true,
+                    fillColor: row[3],
+                    fillOpacity: 0.7,
+                    weight: 2
+                })
+                .bindPopup(row[2], {maxWidth: 320})
+                .bindTooltip(row[4])
+                .addTo({{ this._parent.get_name() }});
+            });
+        {% endmacro %}
+    """)
+    
+    def __init__(self, data):
+        super().__init__()
+        self._name = 'ListingMarkers'
+        self.data = data
+
+def get_price_colors(prices):
     """Color code by price range"""
-    if price < 2800:
-        return 'green'
-    elif price < 3500:
-        return 'orange'
-    else:
-        return 'red'
+    prices = np.asarray(prices)
+    return np.select([prices < 2800, prices < 3500], ['green', 'orange'], default='red')
+
+def build_marker_labels(filtered_df):
+    """Build popup HTML and tooltip text for every listing in one vectorized pass"""
+    price_str = filtered_df['price_monthly'].map('{:.0f}'.format)
+    beds_str = filtered_df['bedrooms'].map('{:g}'.format)
+    parking_cost = filtered_df['parking_cost_yearly'].fillna(0)
+    
+    popups = (
+        "<div style='width: 280px; font-family: Arial;'>"
+        "<h4 style='color: #003660; margin-bottom: 10px;'>" + filtered_df['address'].astype(str) + "</h4>"
+        "<hr style='margin: 10px 0;'>"
+        "<p style='font-size: 18px; color: #d9534f;'><b>💰 $" + price_str + "/month</b></p>"
+        "<p><b>🛏️ Bedrooms:</b> " + beds_str + " | <b>🚿 Bathrooms:</b> " + filtered_df['bathrooms'].astype(str) + "</p>"
+        "<p><b>👥 Capacity:</b> " + filtered_df['person_capacity'].map('{:g}'.format) + " people</p>"
+        "<hr style='margin: 10px 0;'>"
+        "<p><b>📍 Walk to Campus:</b> " + filtered_df['walk_time_to_campus_min'].map('{:.1f}'.format) + " minutes</p>"
+        "<p><b>📏 Distance:</b> " + filtered_df['distance_to_ucsb_meters'].map('{:.0f}'.format) + "m from UCSB</p>"
+        "<p><b>🔊 Noise Level:</b> " + filtered_df['noise_score'].map('{:.1f}'.format) + "/10</p>"
+        "<p><b>📅 Available:</b> " + filtered_df['available_date'].dt.strftime('%B %d, %Y') + "</p>"
+        "<hr style='margin: 10px 0;'>"
+        "<p><b>✨ Amenities:</b><br>" + filtered_df['amenities'].astype(str) + "</p>"
+        + ("<p><b>🅿️ Parking:</b> $" + parking_cost.astype(int).astype(str) + "/year</p>").where(parking_cost > 0, '')
+        + pd.Series('<p style="color: green;">✓ Remodeled</p>', index=filtered_df.index).where(
+            filtered_df['is_remodeled'] == True, '')
+        + pd.Series('<p style="color: green;">✓ Balcony/Patio</p>', index=filtered_df.index).where(
+            (filtered_df['has_balcony'] == True) | (filtered_df['has_patio'] == True), '')
+        + "<hr style='margin: 10px 0;'>"
+        "<a href='" + filtered_df['source_url'].astype(str) + "' target='_blank' style='color: #0055a2;'>"
+        "<b>View Original Listing →</b></a>"
+        "</div>"
+    )
+    tooltips = "$" + price_str + " - " + beds_str + "bed - Unit " + filtered_df['unit_number'].astype(str)
+    
+    return popups.tolist(), tooltips.tolist()
 
 def create_map(filtered_df):
     """Create interactive Folium map"""
@@ -70,7 +187,8 @@ def create_map(filtered_df):
     m = folium.Map(
         location=[34.4133, -119.8550],
         zoom_start=15,
-        tiles='OpenStreetMap'
+        tiles='OpenStreetMap',
+        prefer_canvas=True
     )
     
     # Add UCSB campus marker
@@ -89,48 +207,122 @@ def create_map(filtered_df):
         tooltip='Del Playa - High Noise Area'
     ).add_to(m)
     
-    # Add listing markers
-    for idx, row in filtered_df.iterrows():
-        # Create detailed popup
-        popup_html = f"""
-        <div style='width: 280px; font-family: Arial;'>
-            <h4 style='color: #003660; margin-bottom: 10px;'>{row['address']}</h4>
-            <hr style='margin: 10px 0;'>
-            <p style='font-size: 18px; color: #d9534f;'><b>💰 ${row['price_monthly']:.0f}/month</b></p>
-            <p><b>🛏️ Bedrooms:</b> {row['bedrooms']} | <b>🚿 Bathrooms:</b> {row['bathrooms']}</p>
-            <p><b>👥 Capacity:</b> {row['person_capacity']} people</p>
-            <hr style='margin: 10px 0;'>
-            <p><b>📍 Walk to Campus:</b> {row['walk_time_to_campus_min']:.1f} minutes</p>
-            <p><b>📏 Distance:</b> {row['distance_to_ucsb_meters']:.0f}m from UCSB</p>
-            <p><b>🔊 Noise Level:</b> {row['noise_score']:.1f}/10</p>
-            <p><b>📅 Available:</b> {row['available_date'].strftime('%B %d, %Y')}</p>
-            <hr style='margin: 10px 0;'>
-            <p><b>✨ Amenities:</b><br>{row['amenities']}</p>
-            {'<p><b>🅿️ Parking:</b> $' + str(int(row['parking_cost_yearly'])) + '/year</p>' if row['parking_cost_yearly'] > 0 else ''}
-            {'<p style="color: green;">✓ Remodeled</p>' if row['is_remodeled'] else ''}
-            {'<p style="color: green;">✓ Balcony/Patio</p>' if row['has_balcony'] or row['has_patio'] else ''}
-            <hr style='margin: 10px 0;'>
-            <a href='{row['source_url']}' target='_blank' style='color: #0055a2;'>
-                <b>View Original Listing →</b>
-            </a>
-        </div>
-        """
-        
-        # Marker with color coding
-        folium.CircleMarker(
-            location=[row['latitude'], row['longitude']],
-            radius=10,
-            popup=folium.Popup(popup_html, max_width=320),
-            color=get_price_color(row['price_monthly']),
-            fill=True,
-            fillColor=get_price_color(row['price_monthly']),
-            fillOpacity=0.7,
-            weight=2,
-            tooltip=f"${row['price_monthly']:.0f} - {row['bedrooms']}bed - Unit {row['unit_number']}"
-        ).add_to(m)
+    # Cap what the browser has to draw, keeping the cheapest listings
+    if len(filtered_df) > MAX_MAP_MARKERS:
+        filtered_df = filtered_df.nsmallest(MAX_MAP_MARKERS, 'price_monthly')
+    
+    # Add listing markers (built client-side from one data array)
+    popups, tooltips = build_marker_labels(filtered_df)
+    colors = get_price_colors(filtered_df['price_monthly'].to_numpy())
+    
+    data = list(zip(
+        filtered_df['latitude'].tolist(),
+        filtered_df['longitude'].tolist(),
+        popups,
+        colors.tolist(),
+        tooltips
+    ))
+    cluster = MarkerCluster().add_to(m)
+    ListingMarkers(data).add_to(cluster)
     
     return m
 
+def filter_listings(df, price_range, bedrooms, bathrooms, max_distance, max_noise,
+                    remodeled_only, parking_only, balcony_only, date_range):
+    """Apply sidebar filter values to the listings"""
+    # Build one boolean mask and slice once
+    price = df['price_monthly'].to_numpy()
+    mask = (
+        (price >= price_range[0]) &
+        (price <= price_range[1]) &
+        df['bedrooms'].isin(bedrooms).to_numpy(dtype=bool) &
+        df['bathrooms'].isin(bathrooms).to_numpy(dtype=bool) &
+        (df['walk_time_to_campus_min'].to_numpy() <= max_distance) &
+        (df['noise_score'].to_numpy() <= max_noise)
+    )
+    
+    if remodeled_only:
+        mask &= df['is_remodeled'].to_numpy(dtype=bool)
+    if parking_only:
+        mask &= df['has_parking'].to_numpy(dtype=bool)
+    if balcony_only:
+        mask &= df['has_balcony'].to_numpy(dtype=bool) | df['has_patio'].to_numpy(dtype=bool)
+    
+    if len(date_range) == 2:
+        # Half-open day range on the native datetime64 values, no per-row cast
+        dates = df['available_date'].to_numpy()
+        start = np.datetime64(date_range[0])
+        end = np.datetime64(date_range[1]) + np.timedelta64(1, 'D')
+        mask &= (dates >= start) & (dates < end)
+    
+    filtered_df = df[mask]
+    
+    return filtered_df
+
+@st.cache_data(max_entries=32)
+def compute_filtered(price_range, bedrooms, bathrooms, max_distance, max_noise,
+                     remodeled_only, parking_only, balcony_only, date_range, data_version):
+    """Filtered listings for one filter state, cached across reruns"""
+    return filter_listings(
+        load_data(data_version), price_range, bedrooms, bathrooms, max_distance, max_noise,
+        remodeled_only, parking_only, balcony_only, date_range
+    )
+
+@st.cache_data(max_entries=16, ttl=3600)
+def render_map_html(filter_key, data_version):
+    """Render the map for a filter state to standalone HTML"""
+    filtered_df = compute_filtered(*filter_key, data_version)
+    return create_map(filtered_df).get_root().render()
+
+@st.cache_data(max_entries=32)
+def price_histogram(filter_key, data_version, bins=30):
+    """Bin centers, counts and widths of filtered monthly prices"""
+    prices = compute_filtered(*filter_key, data_version)['price_monthly'].to_numpy(dtype='float32')
+    counts, edges = np.histogram(prices[~np.isnan(prices)], bins=bins)
+    return (edges[:-1] + edges[1:]) / 2, counts, np.diff(edges)
+
+@st.fragment
+def render_listings_table(filtered_df):
+    """Listings table; its own widgets rerun only this fragment"""
+    if len(filtered_df) > 0:
+        # Display options
+        show_columns = st.multiselect(
+            "Select columns to display:",
+            options=filtered_df.columns.tolist(),
+            default=['address', 'unit_number', 'price_monthly', 'bedrooms', 'bathrooms', 
+                    'walk_time_to_campus_min', 'noise_score', 'available_date', 'amenities']
+        )
+        
+        # Sort options
+        sort_by = st.selectbox("Sort by:", options=['price_monthly', 'walk_time_to_campus_min', 
+                                                    'noise_score', 'available_date', 'bedrooms'])
+        sort_order = st.radio("Order:", ['Ascending', 'Descending'], horizontal=True)
+        
+        # Apply sorting
+        display_df = filtered_df[show_columns].sort_values(
+            by=sort_by,
+            ascending=(sort_order == 'Ascending')
+        )
+        
+        # Display table
+        st.dataframe(
+            display_df,
+            use_container_width=True,
+            height=600,
+            hide_index=True
+        )
+        
+        # Download button
+        csv = display_df.to_csv(index=False)
+        st.download_button(
+            label="📥 Download as CSV",
+            data=csv,
+            file_name=f"ucsb_housing_filtered_{datetime.now().strftime('%Y%m%d')}.csv",
+            mime="text/csv"
+        )
+    else:
+        st.info("No listings to display with current filters.")
+
 def main():
     # Header
     st.markdown("""
@@ -143,7 +335,8 @@ def main():
     """, unsafe_allow_html=True)
     
     # Load data
-    df = load_data()
+    data_version = get_data_version()
+    df = load_data(data_version)
     
     # Sidebar filters
     st.sidebar.header("🔍 Filter Listings")
@@ -205,27 +398,11 @@ def main():
     )
     
     # Apply filters
-    filtered_df = df[
-        (df['price_monthly'] >= price_range[0]) &
-        (df['price_monthly'] <= price_range[1]) &
-        (df['bedrooms'].isin(bedrooms)) &
-        (df['bathrooms'].isin(bathrooms)) &
-        (df['walk_time_to_campus_min'] <= max_distance) &
-        (df['noise_score'] <= max_noise)
-    ]
-    
-    if remodeled_only:
-        filtered_df = filtered_df[filtered_df['is_remodeled'] == True]
-    if parking_only:
-        filtered_df = filtered_df[filtered_df['has_parking'] == True]
-    if balcony_only:
-        filtered_df = filtered_df[(filtered_df['has_balcony'] == True) | (filtered_df['has_patio'] == True)]
-    
-    if len(date_range) == 2:
-        filtered_df = filtered_df[
-            (filtered_df['available_date'].dt.date >= date_range[0]) &
-            (filtered_df['available_date'].dt.date <= date_range[1])
-        ]
+    filter_key = (
+        tuple(price_range), tuple(bedrooms), tuple(bathrooms), max_distance, max_noise,
+        remodeled_only, parking_only, balcony_only, tuple(date_range)
+    )
+    filtered_df = compute_filtered(*filter_key, data_version)
     
     # Main content area
     col1, col2, col3, col4 = st.columns(4)
@@ -246,9 +423,14 @@ def main():
         st.subheader("Interactive Housing Map")
         
         if len(filtered_df) > 0:
+            if len(filtered_df) > MAX_MAP_MARKERS:
+                st.warning(
+                    f"Showing the {MAX_MAP_MARKERS:,} lowest-priced of {len(filtered_df):,} matching "
+                    "listings on the map. Narrow the filters to see the rest."
+                )
+            
             # Create and display map
-            m = create_map(filtered_df)
-            st_folium(m, width=1200, height=600)
+            components.html(render_map_html(filter_key, data_version), height=600)
             
             # Legend
             st.markdown("""
@@ -256,6 +438,7 @@ def main():
             - 🟢 **Green**: Under $2,800/month (Budget-friendly)
             - 🟠 **Orange**: $2,800-$3,500/month (Mid-range)
             - 🔴 **Red**: Over $3,500/month (Premium)
+            - 🔢 **Numbered Bubbles**: Clusters of nearby listings (zoom in to expand)
             - 🔵 **Blue Pin**: UCSB Campus
             - 🔴 **Red Pin**: Del Playa (High noise area)
             """)
@@ -269,14 +452,14 @@ def main():
             col1, col2 = st.columns(2)
             
             with col1:
-                # Price distribution
-                fig_price = px.histogram(
-                    filtered_df,
-                    x='price_monthly',
-                    nbins=30,
+                # Price distribution (binned server-side, only the bars are sent)
+                centers, counts, widths = price_histogram(filter_key, data_version)
+                fig_price = go.Figure(go.Bar(x=centers, y=counts, width=widths, marker_color='#003660'))
+                fig_price.update_layout(
                     title="Price Distribution",
-                    labels={'price_monthly': 'Monthly Rent ($)'},
-                    color_discrete_sequence=['#003660']
+                    xaxis_title='Monthly Rent ($)',
+                    yaxis_title='count',
+                    bargap=0
                 )
                 st.plotly_chart(fig_price, use_container_width=True)
                 
@@ -289,7 +472,8 @@ def main():
                     color='bedrooms',
                     title="Noise Level vs Price",
                     labels={'noise_score': 'Noise Score', 'price_monthly': 'Price ($)'},
-                    hover_data=['address', 'bedrooms']
+                    hover_data=['address', 'bedrooms'],
+                    render_mode='webgl'
                 )
                 st.plotly_chart(fig_noise, use_container_width=True)
             
@@ -313,7 +497,8 @@ def main():
                     size='bedrooms',
                     title="Distance to Campus vs Price",
                     labels={'distance_to_ucsb_meters': 'Distance to UCSB (m)', 'price_monthly': 'Price ($)'},
-                    hover_data=['address', 'walk_time_to_campus_min']
+                    hover_data=['address', 'walk_time_to_campus_min'],
+                    render_mode='webgl'
                 )
                 st.plotly_chart(fig_distance, use_container_width=True)
             
@@ -332,44 +517,7 @@ def main():
     with tab3:
         st.subheader("📋 All Listings")
         
-        if len(filtered_df) > 0:
-            # Display options
-            show_columns = st.multiselect(
-                "Select columns to display:",
-                options=filtered_df.columns.tolist(),
-                default=['address', 'unit_number', 'price_monthly', 'bedrooms', 'bathrooms', 
-                        'walk_time_to_campus_min', 'noise_score', 'available_date', 'amenities']
-            )
-            
-            # Sort options
-            sort_by = st.selectbox("Sort by:", options=['price_monthly', 'walk_time_to_campus_min', 
-                                                        'noise_score', 'available_date', 'bedrooms'])
-            sort_order = st.radio("Order:", ['Ascending', 'Descending'], horizontal=True)
-            
-            # Apply sorting
-            display_df = filtered_df[show_columns].sort_values(
-                by=sort_by,
-                ascending=(sort_order == 'Ascending')
-            )
-            
-            # Display table
-            st.dataframe(
-                display_df,
-                use_container_width=True,
-                height=600,
-                hide_index=True
-            )
-            
-            # Download button
-            csv = display_df.to_csv(index=False)
-            st.download_button(
-                label="📥 Download as CSV",
-                data=csv,
-                file_name=f"ucsb_housing_filtered_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
-            )
-        else:
-            st.info("No listings to display with current filters.")
+        render_listings_table(filtered_df)
     
     with tab4:
         st.subheader("ℹ️ About This Project")
@@ -28,7 +28,6 @@ def run_pipeline():
     # Step 1: Parse
     print("📄 Step 1: Parsing Kamap PDF...")
     parser = KamapParser('data/raw/kamap_availability.pdf')
-    parser.parse_all()
     df = parser.save_to_csv('data/processed/kamap_processed.csv')
     print(f"   ✅ Parsed {len(df)} listings\n")
     
@@ -36,13 +35,13 @@ def run_pipeline():
     print("🗺️  Step 2: Geocoding addresses...")
     geocoder = AddressGeocoder()
     df_geo = geocoder.geocode_dataframe(df)
-    df_geo.to_csv('data/geocoded/kamap_geocoded.csv', index=False)
+    df_geo.to_parquet('data/geocoded/kamap_geocoded.parquet', compression='zstd', index=False)
     
     # Step 3: Enrich
     print("🔧 Step 3: Engineering features...")
     engineer = FeatureEngineer()
     df_final = engineer.enrich_dataframe(df_geo)
-    df_final.to_csv('data/geocoded/all_listings_geocoded.csv', index=False)
+    df_final.to_parquet('data/geocoded/all_listings_geocoded.parquet', compression='zstd', index=False)
     
     print("\n✨ Pipeline complete! Data ready for Streamlit app.")
     print("   Run: streamlit run app.py")
@@ -3,29 +3,90 @@ Kamap Property Management PDF Parser
 Extracts listings with all metadata
 """
 
+import csv
 import re
 import pandas as pd
 from datetime import datetime
-import pdfplumber
+import pypdfium2 as pdfium
+
+# Common IV street names for Kamap
+_ADDRESS_RE = re.compile(
+    r'(\d{4,5}\s+(?:Cordoba|Abrego|El Nido|Segovia|Sabado Tarde|Trigo|Picasso|Pasado|Camino Corto|Embarcadero del Norte)(?:\s+(?:Rd|St|Ave|Dr|Ln))?)',
+    re.I
+)
+_UNIT_RE = re.compile(r'(\w+)\s*\((\d{1,2}/\d{1,2})\)')
+_UNIT_SECTION_RE = re.compile(r'Unit[s]?\s*#')
+_PRICE_RE = re.compile(r'\$?([\d,]+)')
+_BED_RE = re.compile(r'(\d+)\s*(Bed|Singles?|Person)')
+_BATH_RE = re.compile(r'(\d+(?:\.\d+)?)\s*Bath')
+_PARKING_COST_RE = re.compile(r'\$(\d+)\s*per year')
+
+_FLAG_PATTERNS = [
+    ('is_remodeled', r'Remodeled'),
+    ('has_balcony', r'Balcony'),
+    ('has_patio', r'Patio'),
+    ('has_parking', r'Parking Available'),
+    ('split_floor_plan', r'Split Floor Plan'),
+]
+_AMENITY_PATTERNS = [
+    ('free_internet', r'Free.*Internet', 'Free Internet'),
+    ('water_trash', r'Water.*Trash|Trash.*Water', 'Water/Trash Included'),
+    ('washer_dryer', r'Washer.*Dryer', 'In-Unit Washer/Dryer'),
+    ('gas', r'Gas', 'Gas Included'),
+]
+
+# All flags and amenities in a single scan. The alternation sits inside a
+# zero-width lookahead so a long match (e.g. Free...Internet) never
+# consumes a keyword that appears inside it.
+_FEATURES_RE = re.compile(
+    '(?=' + '|'.join(
+        f'(?P<{name}>{pattern})'
+        for name, pattern, *_ in _FLAG_PATTERNS + _AMENITY_PATTERNS
+    ) + ')',
+    re.I
+)
+
+# Output columns, in CSV order
+COLUMNS = [
+    'listing_id', 'property_management', 'address', 'unit_number',
+    'price_monthly', 'available_date', 'source_url', 'scraped_date',
+    'bedrooms', 'bathrooms', 'room_type', 'person_capacity',
+    'is_remodeled', 'has_balcony', 'has_patio', 'has_parking',
+    'split_floor_plan', 'parking_cost_yearly', 'amenities', 'description'
+]
+COLUMN_DTYPES = {
+    'price_monthly': 'float32',
+    'bedrooms': 'float32',
+    'bathrooms': 'float32',
+    'person_capacity': 'float32',
+    'is_remodeled': 'bool',
+    'has_balcony': 'bool',
+    'has_patio': 'bool',
+    'has_parking': 'bool',
+    'split_floor_plan': 'bool',
+    'parking_cost_yearly': 'float32'
+}
 
 class KamapParser:
     def __init__(self, pdf_path):
         self.pdf_path = pdf_path
         self.current_year = 2026
-        self.listings = []
         
-    def extract_text(self):
-        """Extract text from PDF"""
-        with pdfplumber.open(self.pdf_path) as pdf:
-            text = ""
-            for page in pdf.pages:
-                text += page.extract_text() + "\n"
-        return text
+    def _iter_page_text(self):
+        """Yield the text of each PDF page in turn"""
+        pdf = pdfium.PdfDocument(self.pdf_path)
+        try:
+            for page in pdf:
+                textpage = page.get_textpage()
+                yield textpage.get_text_range()
+                textpage.close()
+                page.close()
+        finally:
+            pdf.close()
     
     def parse_unit_numbers(self, unit_text):
         """Extract unit numbers and dates"""
-        pattern = r'(\w+)\s*\((\d{1,2}/\d{1,2})\)'
-        matches = re.findall(pattern, unit_text)
+        matches = _UNIT_RE.findall(unit_text)
         
         units = []
         for unit_num, date_str in matches:
@@ -43,15 +104,15 @@ class KamapParser:
     
     def parse_price(self, price_str):
         """Extract numeric price"""
-        match = re.search(r'\$?([\d,]+)', price_str)
+        match = _PRICE_RE.search(price_str)
         if match:
             return float(match.group(1).replace(',', ''))
         return None
     
     def parse_room_type(self, room_str):
         """Parse bedroom/bathroom configuration"""
-        bed_match = re.search(r'(\d+)\s*(Bed|Singles?|Person)', room_str)
-        bath_match = re.search(r'(\d+(?:\.\d+)?)\s*Bath', room_str)
+        bed_match = _BED_RE.search(room_str)
+        bath_match = _BATH_RE.search(room_str)
         
         beds = int(bed_match.group(1)) if bed_match else None
         baths = float(bath_match.group(1)) if bath_match else None
@@ -66,56 +127,38 @@ class KamapParser:
     
     def extract_features(self, description):
         """Extract amenities and boolean features"""
-        features = {
-            'is_remodeled': bool(re.search(r'Remodeled', description, re.I)),
-            'has_balcony': bool(re.search(r'Balcony', description, re.I)),
-            'has_patio': bool(re.search(r'Patio', description, re.I)),
-            'has_parking': bool(re.search(r'Parking Available', description, re.I)),
-            'split_floor_plan': bool(re.search(r'Split Floor Plan', description, re.I)),
-        }
+        found = {match.lastgroup for match in _FEATURES_RE.finditer(description)}
+        
+        features = {name: name in found for name, _ in _FLAG_PATTERNS}
         
         # Parking cost
-        parking_cost_match = re.search(r'\$(\d+)\s*per year', description)
+        parking_cost_match = _PARKING_COST_RE.search(description)
         features['parking_cost_yearly'] = float(parking_cost_match.group(1)) if parking_cost_match else 0
         
         # Amenities
-        amenities = []
-        if re.search(r'Free.*Internet', description, re.I):
-            amenities.append('Free Internet')
-        if re.search(r'Water.*Trash|Trash.*Water', description, re.I):
-            amenities.append('Water/Trash Included')
-        if re.search(r'Washer.*Dryer', description, re.I):
-            amenities.append('In-Unit Washer/Dryer')
-        if re.search(r'Gas', description, re.I):
-            amenities.append('Gas Included')
-            
+        amenities = [label for name, _, label in _AMENITY_PATTERNS if name in found]
+        
         features['amenities'] = ', '.join(amenities) if amenities else 'None listed'
         
         return features
     
     def parse_all(self):
-        """Main parsing logic"""
-        text = self.extract_text()
-        
-        # Common IV street names for Kamap
-        address_pattern = r'(\d{4,5}\s+(?:Cordoba|Abrego|El Nido|Segovia|Sabado Tarde|Trigo|Picasso|Pasado|Camino Corto|Embarcadero del Norte)(?:\s+(?:Rd|St|Ave|Dr|Ln))?)'
-        
+        """Main parsing logic; yields one listing dict per unit"""
         current_address = None
         
-        for line in text.split('\n'):
-            line = line.strip()
-            
-            # Check for address
-            addr_match = re.search(address_pattern, line, re.I)
-            if addr_match:
-                current_address = addr_match.group(1)
-                continue
-            
-            # Parse listing lines
-            if line.startswith('$') and current_address:
-                self._parse_listing_line(line, current_address)
-        
-        return self.listings
+        for page_text in self._iter_page_text():
+            for line in page_text.split('\n'):
+                line = line.strip()
+                
+                # Check for address
+                addr_match = _ADDRESS_RE.search(line)
+                if addr_match:
+                    current_address = addr_match.group(1)
+                    continue
+                
+                # Parse listing lines
+                if line.startswith('$') and current_address:
+                    yield from self._parse_listing_line(line, current_address)
     
     def _parse_listing_line(self, line, address):
         """Parse individual listing line"""
@@ -127,7 +170,7 @@ class KamapParser:
         rest = parts[1]
         
         # Find unit section
-        unit_match = re.search(r'Unit[s]?\s*#', rest)
+        unit_match = _UNIT_SECTION_RE.search(rest)
         if not unit_match:
             return
         
@@ -140,7 +183,7 @@ class KamapParser:
         
         # Create listing for each unit
         for unit_info in units:
-            listing = {
+            yield {
                 'listing_id': f"kamap_{address.replace(' ', '_')}_{unit_info['unit_number']}".lower(),
                 'property_management': 'Kamap Property Management',
                 'address': f"{address}, Isla Vista, CA 93117",
@@ -153,16 +196,19 @@ class KamapParser:
                 **features,
                 'description': line.strip()
             }
-            
-            self.listings.append(listing)
-    
-    def to_dataframe(self):
-        """Convert to DataFrame"""
-        return pd.DataFrame(self.listings)
     
     def save_to_csv(self, output_path):
-        """Save to CSV"""
-        df = self.to_dataframe()
-        df.to_csv(output_path, index=False)
-        print(f"✅ Saved {len(df)} listings to {output_path}")
-        return df
+        """Stream listings to CSV one row at a time, then load the result"""
+        count = 0
+        with open(output_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS)
+            writer.writeheader()
+            for listing in self.parse_all():
+                writer.writerow(listing)
+                count += 1
+        print(f"✅ Saved {count} listings to {output_path}")
+        return pd.read_csv(
+            output_path,
+            dtype=COLUMN_DTYPES,
+            parse_dates=['available_date', 'scraped_date']
+        )